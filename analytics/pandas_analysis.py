@@ -1,16 +1,57 @@
 import pandas as pd
-import io
+import pyarrow as pa
+import pyarrow.parquet as pq
 import sys
 import os
+from concurrent.futures import ThreadPoolExecutor
 
 # Add project root to path
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 from storage.swift_client import get_swift_connection
 
+# Concurrent Swift GETs used when loading a day of archives
+DOWNLOAD_WORKERS = 16
 
-def load_day_from_swift(date_str):
+
+def _download_object(fname):
+    """Download one object using the current thread's Swift connection"""
+    _, content = get_swift_connection().get_object("sensor-archive", fname)
+    return content
+
+
+def _read_parquet(content, columns=None, filters=None):
+    """Read a Parquet object as an Arrow table, pruning columns and row groups at the file layer"""
+    return pq.read_table(pa.BufferReader(content), columns=columns, filters=filters, use_threads=True)
+
+
+def _normalize_table(table):
+    """
+    Cast an archive table to a common read schema, so files written with
+    different schemas (plain string/float64 vs dictionary/float32) concatenate
+    """
+    fields = []
+    for field in table.schema:
+        value_type = field.type
+        if pa.types.is_dictionary(value_type):
+            value_type = value_type.value_type
+        if pa.types.is_floating(value_type):
+            value_type = pa.float64()
+        elif pa.types.is_timestamp(value_type):
+            value_type = pa.timestamp("ns", tz="UTC")
+        fields.append(pa.field(field.name, value_type))
+    # Per-file pandas metadata would disagree between versions, so drop it
+    return table.cast(pa.schema(fields))
+
+
+def load_day_from_swift(date_str, columns=None, filters=None):
     """
     Load all hourly Parquet files for a given day (YYYYMMDD) into a single DataFrame
+
+    Args:
+        date_str: Day to load, as YYYYMMDD
+        columns: Optional list of columns to read, e.g. ["time", "temperature"]
+        filters: Optional pyarrow predicate, e.g. [("sensor_id", "=", "sensor-1")];
+            row groups whose statistics rule it out are skipped before decompression
     """
     conn = get_swift_connection()
     _, objects = conn.get_container("sensor-archive")
@@ -18,12 +59,14 @@ def load_day_from_swift(date_str):
     # Filter for parquet files from the given day
     parquet_files = [obj['name'] for obj in objects if obj['name'].startswith(f"hourly/{date_str}")]
 
-    dfs = []
-    for fname in parquet_files:
-        _, content = conn.get_object("sensor-archive", fname)
-        dfs.append(pd.read_parquet(io.BytesIO(content)))
+    if not parquet_files:
+        return pd.DataFrame()  # empty if no files found
+
+    # Downloads are independent, so overlap them
+    with ThreadPoolExecutor(max_workers=min(DOWNLOAD_WORKERS, len(parquet_files))) as executor:
+        contents = list(executor.map(_download_object, parquet_files))
 
-    if dfs:
-        return pd.concat(dfs, ignore_index=True)
-    else:
-        return pd.DataFrame()  # empty if no files found
\ No newline at end of file
+    # Concatenate as Arrow chunks (no copy) and convert to pandas once
+    tables = [_normalize_table(_read_parquet(content, columns, filters)) for content in contents]
+    combined = pa.concat_tables(tables, promote_options="default")
+    return combined.to_pandas(self_destruct=True, split_blocks=True, use_threads=True)
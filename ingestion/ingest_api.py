@@ -1,7 +1,12 @@
 from flask import Flask, request, jsonify
+import atexit
 import datetime
-from influxdb_client import InfluxDBClient, Point, WritePrecision
+import math
+from collections import deque
+from influxdb_client import InfluxDBClient, WritePrecision
+from influxdb_client.client.write_api import WriteOptions, WriteType
 import os
+import pandas as pd
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -15,11 +20,79 @@ org = "Dev Team"
 host = "https://us-east-1-1.aws.cloud2.influxdata.com"
 bucket = "Sensor Data"  # In InfluxDB 2.x, it's called "bucket" not "database"
 
-client = InfluxDBClient(url=host, token=token, org=org)
-write_api = client.write_api()
+client = InfluxDBClient(url=host, token=token, org=org, enable_gzip=True)
+# Points are buffered and flushed in batches by a background thread
+write_api = client.write_api(write_options=WriteOptions(
+  write_type=WriteType.batching,
+  batch_size=500,
+  flush_interval=5000,
+  jitter_interval=1000
+))
 query_api = client.query_api()
 
-sensor_data = []
+def close_influxdb():
+  """Flush buffered points and close the InfluxDB client on shutdown"""
+  write_api.close()
+  client.close()
+
+atexit.register(close_influxdb)
+
+# Most recent readings only; older entries are evicted as new ones arrive
+sensor_data = deque(maxlen=50)
+
+def to_epoch_ms(timestamp):
+  """Convert a reading timestamp (epoch ms or ISO-8601 string) to epoch milliseconds"""
+  if isinstance(timestamp, str):
+    dt = datetime.datetime.fromisoformat(timestamp)
+    # Naive timestamps are UTC, not the server's local time
+    if dt.tzinfo is None:
+      dt = dt.replace(tzinfo=datetime.timezone.utc)
+    return int(dt.timestamp() * 1000)
+  return int(timestamp)
+
+REQUIRED_FIELDS = ["sensor_id", "timestamp", "temperature", "humidity", "cpu"]
+
+def missing_field(data):
+  """Return the first required field missing from a reading, or None"""
+  for field in REQUIRED_FIELDS:
+    if field not in data:
+      return field
+  return None
+
+FIELD_NAMES = ["cpu", "humidity", "temperature"]
+
+def invalid_field(data):
+  """Return why a reading can't be written as line protocol, or None"""
+  if data["sensor_id"] is None or str(data["sensor_id"]) == "":
+    return "sensor_id must not be empty"
+  for field in FIELD_NAMES:
+    value = data[field]
+    # bool is an int subclass, and NaN/inf have no line-protocol form
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+      return f"{field} must be a finite number"
+  return None
+
+def escape_tag(value):
+  """Escape a tag value for line protocol"""
+  return str(value).replace("\\", "\\\\").replace(",", "\\,").replace("=", "\\=").replace(" ", "\\ ")
+
+def to_line_protocol(data):
+  """
+  Format a validated reading as a line-protocol string with millisecond timestamp.
+  Tags and fields are emitted in lexicographic key order so InfluxDB doesn't re-sort them on ingest.
+  """
+  return (
+    f"sensors,sensor_id={escape_tag(data['sensor_id'])} "
+    f"cpu={float(data['cpu'])!r},humidity={float(data['humidity'])!r},temperature={float(data['temperature'])!r} "
+    f"{to_epoch_ms(data['timestamp'])}"
+  )
+
+def to_dataframe(readings):
+  """Build a time-indexed DataFrame from validated readings for a bulk write"""
+  df = pd.DataFrame(readings, columns=REQUIRED_FIELDS)
+  df.index = pd.to_datetime([to_epoch_ms(ts) for ts in df["timestamp"]], unit="ms", utc=True)
+  # Field columns in lexicographic order, matching to_line_protocol
+  return df[["sensor_id", "cpu", "humidity", "temperature"]].astype({"cpu": float, "humidity": float, "temperature": float})
 
 @app.route("/ingest", methods=['POST'])
 def ingest_data():
@@ -29,43 +102,74 @@ def ingest_data():
     print(f"Received data: {data}")
     
     # Validate required fields
-    required_fields = ["sensor_id", "timestamp", "temperature", "humidity", "cpu"]
-    for field in required_fields:
-      if field not in data:
-        return jsonify({"error": f"Missing required field: {field}"}), 400
+    field = missing_field(data)
+    if field:
+      return jsonify({"error": f"Missing required field: {field}"}), 400
+    error = invalid_field(data)
+    if error:
+      return jsonify({"error": error}), 400
+    # Convert before storing anything, so a bad timestamp is rejected cleanly
+    try:
+      line = to_line_protocol(data)
+    except (TypeError, ValueError) as e:
+      return jsonify({"error": f"Invalid timestamp: {e}"}), 400
 
     # Add data to list of sensor data (this is where we would store the data in a database)
     sensor_data.append(data)
     
-    # Create InfluxDB point (2.x syntax)
-    point = (
-    Point("sensors")
-    .tag("sensor_id", data["sensor_id"])
-    .field("temperature", data["temperature"])
-    .field("humidity", data["humidity"])
-    .field("cpu", data["cpu"])
-    .time(data["timestamp"], WritePrecision.NS)
-    )
-    
-    # Write to InfluxDB 2.x
-    try:
-      write_api.write(bucket=bucket, record=point)
-      print(f"[{datetime.datetime.now()}] Data written to InfluxDB: {data}")
-    except Exception as db_error:
-      print(f"[{datetime.datetime.now()}] Error writing to InfluxDB: {db_error}")
-      # Continue processing even if DB write fails
-      pass
+    # Queue point for the batching writer (flushed asynchronously)
+    write_api.write(bucket=bucket, record=line, write_precision=WritePrecision.MS)
 
     print(f"[{datetime.datetime.now()}] Received: {data}")
     return jsonify({"status": "ok"}), 200
   except Exception as e:
     return jsonify({"error": str(e)}), 500
+
+@app.route("/ingest/batch", methods=['POST'])
+def ingest_batch():
+  """Endpoint to ingest a JSON array of sensor readings in one request"""
+  try:
+    readings = request.json
+    if not isinstance(readings, list):
+      return jsonify({"error": "Expected a JSON array of readings"}), 400
+
+    # Validate the whole batch before writing any of it
+    for i, data in enumerate(readings):
+      if not isinstance(data, dict):
+        return jsonify({"error": f"Reading {i}: expected a JSON object"}), 400
+      field = missing_field(data)
+      if field:
+        return jsonify({"error": f"Reading {i}: missing required field: {field}"}), 400
+      error = invalid_field(data)
+      if error:
+        return jsonify({"error": f"Reading {i}: {error}"}), 400
+
+    # Serialize the whole batch from a DataFrame rather than one Point per reading,
+    # building it before anything is stored so conversion errors reject the batch
+    try:
+      df = to_dataframe(readings)
+    except (TypeError, ValueError, OverflowError) as e:
+      return jsonify({"error": f"Invalid reading: {e}"}), 400
+
+    sensor_data.extend(readings)
+    write_api.write(
+      bucket=bucket,
+      record=df,
+      data_frame_measurement_name="sensors",
+      data_frame_tag_columns=["sensor_id"],
+      write_precision=WritePrecision.MS
+    )
+
+    print(f"[{datetime.datetime.now()}] Received batch of {len(readings)} readings")
+    return jsonify({"status": "ok", "count": len(readings)}), 200
+  except Exception as e:
+    return jsonify({"error": str(e)}), 500
     
 @app.route("/data", methods=["GET"])
 def get_data():
   """Endpoint to view what we've collected so far"""
   # Return last 50 readings
-  return jsonify(sensor_data[-50:])
+  return jsonify(list(sensor_data))
 
 @app.route("/influxdb-data", methods=["GET"])
 def get_influxdb_data():
@@ -75,14 +179,17 @@ def get_influxdb_data():
     query = f'from(bucket: "{bucket}") |> range(start: -1h) |> filter(fn: (r) => r._measurement == "sensors") |> limit(n: 50)'
     tables = query_api.query(query=query)
     
+    # Read straight from each record's values dict, with the append hoisted out of the loop
     data = []
+    append = data.append
     for table in tables:
       for record in table.records:
-        data.append({
-          "time": record.get_time().isoformat(),
-          "sensor_id": record.values.get("sensor_id"),
-          "field": record.get_field(),
-          "value": record.get_value()
+        values = record.values
+        append({
+          "time": values["_time"].isoformat(),
+          "sensor_id": values.get("sensor_id"),
+          "field": values["_field"],
+          "value": values["_value"]
         })
     
     return jsonify({"data": data, "count": len(data)})
@@ -90,4 +197,5 @@ def get_influxdb_data():
     return jsonify({"error": str(e)}), 500  
 
 if __name__ == "__main__":
-  app.run(host="0.0.0.0", port=5000, debug=True)
+  # Development server only; use wsgi.py under gunicorn in production
+  app.run(host="0.0.0.0", port=5000, debug=os.environ.get("FLASK_DEBUG") == "1")
@@ -1,39 +1,54 @@
 import time
 import random
-import datetime
 import requests
+from requests.adapters import HTTPAdapter
 
 # Ingest API URL
-API_URL = "http://localhost:5000/ingest"
+API_URL = "http://localhost:5000/ingest/batch"
 
 # List of sensors simulated
 SENSORS = ["sensor-1", "sensor-2", "sensor-3"]
 
+# Readings buffered before each POST (5 seconds' worth)
+BATCH_SIZE = len(SENSORS) * 5
+
 def generate_sensor_data(sensor_id):
   """Simulate one reading for a sensor"""
   return {
     "sensor_id": sensor_id,
-    "timestamp": datetime.datetime.now().isoformat(),
+    "timestamp": int(time.time() * 1000), # epoch milliseconds
     "temperature": round(20 + random.uniform(-3, 3), 2), # ~20 ± 3°C
     "humidity": round(45 + random.uniform(-5, 5), 2), # ~45 ± 5%
     "cpu": round(random.uniform(0.0, 1.0), 2), # 0.0–1.0 (normalized load)
   }
 
+def create_session():
+  """HTTP session that keeps the connection to the ingest API alive between POSTs"""
+  session = requests.Session()
+  adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+  session.mount("http://", adapter)
+  session.mount("https://", adapter)
+  return session
+
 def main():
   """Main loop to generate and send sensor data"""
+  session = create_session()
+  batch = []
   while True:
     for sensor in SENSORS:
-      # Send data to ingestion API
-      payload = generate_sensor_data(sensor)
+      batch.append(generate_sensor_data(sensor))
 
+    if len(batch) >= BATCH_SIZE:
+      # Send buffered readings to ingestion API
       try:
-        response = requests.post(API_URL, json=payload)
-        print(f"[{sensor}] Sent: {payload} | Status: {response.status_code}")
+        response = session.post(API_URL, json=batch)
+        print(f"Sent {len(batch)} readings | Status: {response.status_code}")
       except Exception as e:
         # Catch any errors
-        print(f"[{sensor}] Error: {e}")
+        print(f"Error: {e}")
+      batch = []
     # Sleep for 1 second (simulate 1hz)
     time.sleep(1)
   
 if __name__ == "__main__":
-  main()
\ No newline at end of file
+  main()
@@ -0,0 +1,14 @@
+"""
+WSGI entry point for the ingest API.
+
+Run under gunicorn with a threaded worker pool, e.g.:
+
+  gunicorn --chdir ingestion wsgi:app -w $(nproc) -k gthread --threads 8 --keep-alive 30
+
+Do not use --preload: each worker must import ingest_api itself so it gets
+its own InfluxDB client and batching writer thread.
+"""
+from ingest_api import app
+
+if __name__ == "__main__":
+  app.run(host="0.0.0.0", port=5000)
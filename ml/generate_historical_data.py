@@ -2,7 +2,7 @@
 Generate historical sensor data using the same method as sensor_simulator.py
 """
 import pandas as pd
-import random
+import numpy as np
 import datetime
 import sys
 import os
@@ -11,16 +11,6 @@ import os
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'storage'))
 from swift_client import archive_parquet_data
 
-def generate_sensor_data(sensor_id, timestamp):
-    """Generate sensor data using the same method as sensor_simulator.py"""
-    return {
-        "sensor_id": sensor_id,
-        "time": timestamp,
-        "temperature": round(20 + random.uniform(-3, 3), 2),  # ~20 ± 3°C
-        "humidity": round(45 + random.uniform(-5, 5), 2),     # ~45 ± 5%
-        "cpu": round(random.uniform(0.0, 1.0), 2),           # 0.0–1.0 (normalized load)
-    }
-
 def generate_historical_data(days=30, interval_minutes=5):
     """
     Generate historical data using the same method as sensor_simulator.py
@@ -41,14 +31,18 @@ def generate_historical_data(days=30, interval_minutes=5):
         freq=f'{interval_minutes}T'
     )
     
-    data = []
     sensors = ["sensor-1", "sensor-2", "sensor-3"]
+    rng = np.random.default_rng()
+    shape = (len(timestamps), len(sensors))
     
-    for timestamp in timestamps:
-        for sensor in sensors:
-            data.append(generate_sensor_data(sensor, timestamp))
-    
-    return pd.DataFrame(data)
+    # One row per (timestamp, sensor), generated column-wise
+    return pd.DataFrame({
+        "sensor_id": np.tile(np.array(sensors), len(timestamps)),
+        "time": np.repeat(timestamps.values, len(sensors)),
+        "temperature": np.round(20 + rng.uniform(-3, 3, shape), 2).ravel(),  # ~20 ± 3°C
+        "humidity": np.round(45 + rng.uniform(-5, 5, shape), 2).ravel(),     # ~45 ± 5%
+        "cpu": np.round(rng.uniform(0.0, 1.0, shape), 2).ravel(),            # 0.0–1.0 (normalized load)
+    })
 
 def main():
     """Generate and archive historical data using original simulator method"""
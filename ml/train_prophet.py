@@ -1,14 +1,37 @@
 import pandas as pd
 from prophet import Prophet
+from prophet.serialize import model_to_json, model_from_json
+from joblib import Parallel, delayed
 import matplotlib.pyplot as plt
 import sys
 import os
 import io
+import re
+import glob
+import json
+import hashlib
+import prophet
 
 # Add the storage directory to the path to import swift_client
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'storage'))
 from swift_client import download_file, list_archived_files
 
+# Fitted models and forecasts, keyed by (sensor, metric, hash of training data + model config)
+MODEL_CACHE_DIR = os.path.join(os.path.dirname(__file__), 'model_cache')
+
+# Prophet settings and forecast horizon; part of the cache key, so changing them refits
+PROPHET_PARAMS = {
+    'daily_seasonality': True,
+    'weekly_seasonality': True,
+    'yearly_seasonality': False,
+    'stan_backend': 'CMDSTANPY',
+}
+FORECAST_PERIODS = 7*24*12  # 7 days, 5-min intervals
+MODEL_CONFIG = json.dumps(
+    {'prophet': prophet.__version__, 'params': PROPHET_PARAMS, 'periods': FORECAST_PERIODS},
+    sort_keys=True
+).encode()
+
 # Download parquet file from Swift storage
 def download_parquet_from_swift(filename):
     """Download a parquet file from Swift and return as DataFrame"""
@@ -24,6 +47,66 @@ def download_parquet_from_swift(filename):
         print(f"Error downloading {filename}: {e}")
         return None
 
+# Remove cached models and forecasts for this (sensor, metric) other than `key`,
+# so the cache holds one entry per model rather than one per training run
+def prune_model_cache(prefix, key):
+    """Delete stale cache files for one (sensor, metric)"""
+    for path in glob.glob(os.path.join(MODEL_CACHE_DIR, glob.escape(prefix) + '*')):
+        match = re.fullmatch(r'([0-9a-f]{64})(\.json|_forecast\.parquet)', os.path.basename(path)[len(prefix):])
+        if match and match.group(1) != key:
+            os.remove(path)
+
+# Train one Prophet model, save its plots and return a printable summary
+def fit_one(sensor, metric, train_df):
+    """Fit, forecast and plot a single (sensor, metric) model"""
+    # Only refit when the training data or the model config has changed since the last run
+    digest = hashlib.sha256(MODEL_CONFIG)
+    digest.update(pd.util.hash_pandas_object(train_df, index=False).values.tobytes())
+    key = digest.hexdigest()
+    prefix = f'{sensor}_{metric}_'
+    model_path = os.path.join(MODEL_CACHE_DIR, f'{prefix}{key}.json')
+    forecast_path = os.path.join(MODEL_CACHE_DIR, f'{prefix}{key}_forecast.parquet')
+    
+    if os.path.exists(model_path) and os.path.exists(forecast_path):
+        lines = [f"{sensor} - {metric}: loaded cached model ({len(train_df)} points)"]
+        with open(model_path) as f:
+            model = model_from_json(f.read())
+        forecast = pd.read_parquet(forecast_path)
+    else:
+        lines = [f"{sensor} - {metric}: trained on {len(train_df)} points"]
+        
+        # Train Prophet model
+        model = Prophet(**PROPHET_PARAMS)
+        model.fit(train_df)
+        
+        # Make future predictions (7 days ahead)
+        future = model.make_future_dataframe(periods=FORECAST_PERIODS)
+        forecast = model.predict(future)
+        
+        os.makedirs(MODEL_CACHE_DIR, exist_ok=True)
+        with open(model_path, 'w') as f:
+            f.write(model_to_json(model))
+        forecast.to_parquet(forecast_path, index=False)
+        prune_model_cache(prefix, key)
+    
+    # Plot results
+    fig = model.plot(forecast)
+    plt.title(f'{sensor} - {metric} Forecast')
+    plt.savefig(f'prophet_{sensor}_{metric}_forecast.png')
+    lines.append(f"    Forecast plot saved as 'prophet_{sensor}_{metric}_forecast.png'")
+    
+    # Also show forecast components
+    fig2 = model.plot_components(forecast)
+    plt.savefig(f'prophet_{sensor}_{metric}_components.png')
+    lines.append(f"    Components plot saved as 'prophet_{sensor}_{metric}_components.png'")
+    
+    # Forecast summary
+    lines.append(f"    Forecast Summary for {metric}:")
+    lines.append(str(forecast[['ds', 'yhat', 'yhat_lower', 'yhat_upper']].tail(3)))
+    
+    plt.close('all')  # Close plots to free memory
+    return "\n".join(lines)
+
 # List available parquet files
 print("Available parquet files:")
 files = list_archived_files()
@@ -69,14 +152,13 @@ if parquet_files:
             sensors = df['sensor_id'].unique()
             print(f"Training models for sensors: {sensors}")
             
+            # Prepare one training set per (sensor, metric)
+            jobs = []
             for sensor in sensors:
-                sensor_data = df[df['sensor_id'] == sensor].copy()
-                print(f"\nTraining model for {sensor} with {len(sensor_data)} records")
+                sensor_data = df[df['sensor_id'] == sensor]
+                print(f"\nPreparing models for {sensor} with {len(sensor_data)} records")
                 
                 for metric in value_columns:
-                    print(f"  Training {metric} model...")
-                    
-                    # Prepare data for this sensor and metric
                     train_df = sensor_data[['ds', metric]].copy()
                     train_df.columns = ['ds', 'y']
                     train_df = train_df.dropna()
@@ -84,35 +166,15 @@ if parquet_files:
                     if len(train_df) < 10:  # Need minimum data points
                         print(f"    Skipping {metric} - insufficient data ({len(train_df)} points)")
                         continue
-                    
-                    # Train Prophet model
-                    model = Prophet(
-                        daily_seasonality=True,
-                        weekly_seasonality=True,
-                        yearly_seasonality=False
-                    )
-                    model.fit(train_df)
-                    
-                    # Make future predictions (7 days ahead)
-                    future = model.make_future_dataframe(periods=7*24*12)  # 7 days, 5-min intervals
-                    forecast = model.predict(future)
-                    
-                    # Plot results
-                    fig = model.plot(forecast)
-                    plt.title(f'{sensor} - {metric} Forecast')
-                    plt.savefig(f'prophet_{sensor}_{metric}_forecast.png')
-                    print(f"    Forecast plot saved as 'prophet_{sensor}_{metric}_forecast.png'")
-                    
-                    # Also show forecast components
-                    fig2 = model.plot_components(forecast)
-                    plt.savefig(f'prophet_{sensor}_{metric}_components.png')
-                    print(f"    Components plot saved as 'prophet_{sensor}_{metric}_components.png'")
-                    
-                    # Print forecast summary
-                    print(f"    Forecast Summary for {metric}:")
-                    print(forecast[['ds', 'yhat', 'yhat_lower', 'yhat_upper']].tail(3))
-                    
-                    plt.close('all')  # Close plots to free memory
+                    jobs.append((sensor, metric, train_df))
+            
+            # Fits are independent and CPU-bound, so run them across all cores
+            print(f"\nTraining {len(jobs)} models in parallel...")
+            summaries = Parallel(n_jobs=-1, backend='loky')(
+                delayed(fit_one)(sensor, metric, train_df) for sensor, metric, train_df in jobs
+            )
+            for summary in summaries:
+                print(summary)
         else:
             print("No value columns found for training")
     else:
@@ -4,12 +4,23 @@ Queries InfluxDB for the last hour of sensor data,
 saves to Parquet, and archives to Swift.
 """
 
+import atexit
 import datetime
-import io
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 import os
 from influxdb_client import InfluxDBClient
-from swift_client import get_swift_connection, ensure_container_exists  # import your Swift helper
+from influxdb_client.client.flux_csv_parser import FluxCsvParserException
+from swiftclient.exceptions import ClientException
+from swift_client import (  # import your Swift helper
+  get_swift_connection,
+  ensure_container_exists,
+  SegmentedUpload,
+  PARQUET_ROW_GROUP_SIZE,
+  UPLOAD_WORKERS,
+)
 
 # InfluxDB client (2.x)
 token = os.environ.get("INFLUXDB_TOKEN")
@@ -17,59 +28,247 @@ org = "Dev Team"
 host = "https://us-east-1-1.aws.cloud2.influxdata.com"
 bucket = "Sensor Data"
 
-client = InfluxDBClient(url=host, token=token, org=org)
-write_api = client.write_api()
+client = InfluxDBClient(url=host, token=token, org=org, enable_gzip=True)
 query_api = client.query_api()
+atexit.register(client.close)
 
 SWIFT_CONTAINER = "sensor-archive"
 
-# Query InfluxDB (last 1 hour of data)
-def query_last_hour():
-  query = f'from(bucket: "{bucket}") |> range(start: -1h) |> filter(fn: (r) => r._measurement == "sensors") |> limit(n: 50)'
+# The hourly query runs as this many concurrent sub-window queries (10 minutes each)
+QUERY_WINDOWS = 6
 
-  # Reshape Influx data into a DataFrame
+# Archive schema, declared up front so Arrow skips type inference
+SCHEMA = pa.schema([
+  ("time", pa.timestamp("ns", tz="UTC")),
+  ("sensor_id", pa.dictionary(pa.int32(), pa.string())),
+  ("temperature", pa.float32()),
+  ("humidity", pa.float32()),
+  ("cpu", pa.float32()),
+])
+ARCHIVE_FIELDS = [name for name in SCHEMA.names if name not in ("time", "sensor_id")]
+
+# Parquet codec for hourly archives (Swift upload bandwidth is the bottleneck)
+ARCHIVE_COMPRESSION = os.environ.get("ARCHIVE_COMPRESSION", "zstd")
+ARCHIVE_COMPRESSION_LEVEL = 3
+
+# Columns whose sample doesn't shrink by at least 10% are stored uncompressed
+COMPRESSION_MIN_SAVING = 0.10
+COMPRESSION_SAMPLE_ROWS = 10_000
+
+# Page sizes for archive reads; row groups are PARQUET_ROW_GROUP_SIZE rows so
+# readers can skip most of an hour via row-group statistics
+DATA_PAGE_SIZE = 1 << 20
+DICTIONARY_PAGE_SIZE_LIMIT = 1 << 20
+
+# Query one [start, stop) window of sensor data into a DataFrame
+def query_window(query_api, start, stop, agg_every=None, agg_fn="mean"):
+  # Project to the archived fields (a pushdown-friendly equality filter)
+  field_filter = " or ".join(f'r._field == "{field}"' for field in ARCHIVE_FIELDS)
+  query = (
+    f'from(bucket: "{bucket}") |> range(start: {start.isoformat()}, stop: {stop.isoformat()})'
+    ' |> filter(fn: (r) => r._measurement == "sensors")'
+    f' |> filter(fn: (r) => {field_filter})'
+  )
+  # Downsample inside InfluxDB rather than shipping raw points
+  if agg_every:
+    query += f' |> aggregateWindow(every: {agg_every}, fn: {agg_fn}, createEmpty: false)'
+  # Only send the columns the archive keeps (after aggregateWindow, which needs _start/_stop)
+  query += ' |> keep(columns: ["_time", "sensor_id", "_field", "_value"])'
+  # Pivot server-side so each row already holds every field for one (time, sensor)
+  pivot = ' |> pivot(rowKey: ["_time"], columnKey: ["_field"], valueColumn: "_value")'
+
+  # Stream the result straight into a DataFrame; only a failure to build the
+  # frame falls back; query and transport errors propagate
   try:
-    with InfluxDBClient(url=host, token=token, org=org) as client:
-      result = client.query_api().query(query=query)
-      records = []
-      for table in result:
-        for record in table.records:
-          records.append({
-            "time": record.get_time(), 
-            "sensor_id": record.values.get("sensor_id"), 
-            record.get_field(): record.get_value()
-          })
-      return pd.DataFrame(records)
-  except Exception as e:
-    print(f"Error querying InfluxDB: {e}")
+    df = query_api.query_data_frame(query=query + pivot)
+  except (ImportError, FluxCsvParserException) as e:
+    print(f"query_data_frame failed ({e}), falling back to record query")
+    return records_to_frame(query_api.query(query=query))
+  if isinstance(df, list):
+    df = pd.concat(df, ignore_index=True) if df else pd.DataFrame()
+  return df
+
+# Fallback: pivot unpivoted Flux records client-side, building each column as a
+# list (one row per (time, sensor)) so pandas allocates every column in one go
+def records_to_frame(tables):
+  rows = {}
+  times = []
+  sensor_ids = []
+  fields = {}
+  for table in tables:
+    for record in table.records:
+      values = record.values
+      key = (values["_time"], values.get("sensor_id"))
+      row = rows.get(key)
+      if row is None:
+        row = rows[key] = len(times)
+        times.append(key[0])
+        sensor_ids.append(key[1])
+        for column in fields.values():
+          column.append(None)
+      column = fields.get(values["_field"])
+      if column is None:
+        column = fields[values["_field"]] = [None] * len(times)
+      column[row] = values["_value"]
+  if not times:
     return pd.DataFrame()
+  return pd.DataFrame({"_time": times, "sensor_id": sensor_ids, **fields})
 
-#  Save to Parquet buffer
-def dataframe_to_parquet(df):
-  buf = io.BytesIO()
-  df.to_parquet(buf, index=False, compression="snappy")
-  buf.seek(0)
-  return buf
+# Archived hours end on an hour boundary, so re-runs map to the same object name
+def last_hour_boundary():
+  return datetime.datetime.now(datetime.timezone.utc).replace(minute=0, second=0, microsecond=0)
 
-# Upload to Swift
-def upload_to_swift(buf, timestamp):
-  conn = get_swift_connection()  
-  ensure_container_exists(conn, SWIFT_CONTAINER)
-  object_name = f"hourly/{timestamp}.parquet"
+def archive_object_name(timestamp):
+  return f"hourly/{timestamp}.parquet"
+
+# Query the hour ending at `end` as concurrent sub-windows, yielding each
+# window's raw DataFrame in time order while later windows are still in flight
+def iter_hour_frames(agg_every="1m", agg_fn="mean", end=None):
+  end = end or last_hour_boundary()
+  start = end - datetime.timedelta(hours=1)
+  step = datetime.timedelta(hours=1) / QUERY_WINDOWS
+  windows = [(start + i * step, start + (i + 1) * step) for i in range(QUERY_WINDOWS)]
+
+  with ThreadPoolExecutor(max_workers=QUERY_WINDOWS) as executor:
+    for df in executor.map(lambda w: query_window(query_api, *w, agg_every, agg_fn), windows):
+      if not df.empty:
+        yield df
+
+# Shape a queried frame into the archive layout
+def clean_frame(df):
+  df = df.drop(columns=["result", "table", "_start", "_stop", "_measurement"], errors="ignore")
+  # Few distinct sensors: store codes + one dictionary instead of a string per row
+  df["sensor_id"] = df["sensor_id"].astype("category")
+  df = df.rename(columns={"_time": "time"})
+  # Keep time as an int64-backed datetime64 column (no per-row Python datetimes)
+  df["time"] = df["time"].astype("datetime64[ns, UTC]")
+  # A window may lack a field entirely; add it as nulls so it still matches SCHEMA
+  return df.reindex(columns=SCHEMA.names)
+
+# Parquet V2 encodings shared by the archive writer and the compression probe:
+# delta-encode the monotonic timestamps, dictionary-encode the sensor tag
+def parquet_encoding_options():
+  return dict(
+    version="2.6",
+    data_page_version="2.0",
+    use_dictionary=["sensor_id"],
+    column_encoding={"time": "DELTA_BINARY_PACKED"},
+    data_page_size=DATA_PAGE_SIZE,
+    dictionary_pagesize_limit=DICTIONARY_PAGE_SIZE_LIMIT,
+    write_statistics=True
+  )
 
-  conn.put_object(
-    SWIFT_CONTAINER,
-    object_name,
-    contents=buf.read(),
-    content_type="application/octet-stream"
+def archive_compression_level(columns):
+  if ARCHIVE_COMPRESSION != "zstd" or not columns:
+    return None
+  return {name: ARCHIVE_COMPRESSION_LEVEL for name in columns}
+
+# Pick a codec per column: compress only where it actually saves space. The
+# sample is written once with the archive's real encodings and codec, then each
+# column chunk's compressed and uncompressed page sizes are read from the footer
+def choose_column_compression(table):
+  if ARCHIVE_COMPRESSION == "none":
+    return {name: "none" for name in table.column_names}
+
+  sink = pa.BufferOutputStream()
+  pq.write_table(
+    table.slice(0, COMPRESSION_SAMPLE_ROWS),
+    sink,
+    compression=ARCHIVE_COMPRESSION,
+    compression_level=archive_compression_level(table.column_names),
+    **parquet_encoding_options()
   )
-  print(f"Uploaded {object_name} to Swift")
+  metadata = pq.ParquetFile(pa.BufferReader(sink.getvalue())).metadata
+
+  compressed = dict.fromkeys(table.column_names, 0)
+  uncompressed = dict.fromkeys(table.column_names, 0)
+  for i in range(metadata.num_row_groups):
+    row_group = metadata.row_group(i)
+    for j in range(row_group.num_columns):
+      column = row_group.column(j)
+      compressed[column.path_in_schema] += column.total_compressed_size
+      uncompressed[column.path_in_schema] += column.total_uncompressed_size
+
+  compression = {}
+  for name in table.column_names:
+    saving = 1 - compressed[name] / uncompressed[name] if uncompressed[name] else 0
+    compression[name] = ARCHIVE_COMPRESSION if saving >= COMPRESSION_MIN_SAVING else "none"
+  return compression
+
+# ParquetWriter options for an archive, with codecs probed on `table`
+def parquet_write_options(table):
+  compression = choose_column_compression(table)
+  compressed_columns = [name for name, codec in compression.items() if codec != "none"]
+  return dict(
+    compression=compression,
+    compression_level=archive_compression_level(compressed_columns),
+    **parquet_encoding_options()
+  )
+
+def write_row_groups(writer, table):
+  for offset in range(0, table.num_rows, PARQUET_ROW_GROUP_SIZE):
+    writer.write_table(table.slice(offset, PARQUET_ROW_GROUP_SIZE))
+
+# Check whether the archive for this hour is already in Swift
+def archive_exists(timestamp):
+  try:
+    get_swift_connection().head_object(SWIFT_CONTAINER, archive_object_name(timestamp))
+    return True
+  except ClientException as e:
+    if e.http_status == 404:
+      return False
+    raise
+
+# Query, encode and upload the hour ending at `end` as one pipeline: each
+# window is encoded as soon as it arrives while later windows are still being
+# queried, and full segments upload in the background as encoding continues.
+# Returns the number of rows archived.
+def archive_hour(end, agg_every="1m", agg_fn="mean"):
+  conn = get_swift_connection()
+  ensure_container_exists(conn, SWIFT_CONTAINER)
+  object_name = archive_object_name(end.strftime("%Y%m%dT%H%M%SZ"))
+
+  rows = 0
+  writer = None
+  with ThreadPoolExecutor(max_workers=UPLOAD_WORKERS) as uploads:
+    sink = SegmentedUpload(conn, SWIFT_CONTAINER, object_name, executor=uploads, headers={"If-None-Match": "*"})
+    try:
+      for df in iter_hour_frames(agg_every, agg_fn, end):
+        table = pa.Table.from_pandas(clean_frame(df), schema=SCHEMA, preserve_index=False)
+        if writer is None:
+          # Codecs are chosen from the first window
+          writer = pq.ParquetWriter(sink, SCHEMA, **parquet_write_options(table))
+        write_row_groups(writer, table)
+        rows += table.num_rows
+      if writer is not None:
+        writer.close()
+    except Exception as e:
+      # Don't leave orphaned segments behind a half-written archive
+      print(f"Error archiving {object_name}: {e}")
+      if writer is not None:
+        try:
+          writer.close()
+        except Exception:
+          pass
+      sink.abort()
+      raise
+
+    if writer is None:
+      return 0
+    try:
+      sink.finish()
+    except ClientException as e:
+      if e.http_status != 412:
+        raise
+      print(f"{object_name} already in Swift, skipping")
+      return rows
+  print(f"Uploaded {object_name} to Swift ({rows} rows)")
+  return rows
 
 if __name__ == "__main__":
-  df = query_last_hour()
-  if not df.empty:
-      buf = dataframe_to_parquet(df)
-      ts_str = datetime.datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
-      upload_to_swift(buf, ts_str)
-  else:
-      print("⚠️ No data found for the last hour.")
\ No newline at end of file
+  end = last_hour_boundary()
+  ts_str = end.strftime("%Y%m%dT%H%M%SZ")
+  if archive_exists(ts_str):
+      print(f"Hour ending {ts_str} already archived, nothing to do.")
+  elif not archive_hour(end):
+      print("⚠️ No data found for the last hour.")
@@ -2,28 +2,58 @@
 Swift Object Storage Client
 """
 import swiftclient
-import json
+import orjson
 from datetime import datetime
 import io
+import threading
+import uuid
+from concurrent.futures import Future, wait, FIRST_COMPLETED
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# One cached connection per thread (swiftclient connections are not thread-safe)
+_conn_local = threading.local()
+
+# Containers already known to exist, so repeat uploads skip the HEAD request
+_known_containers = set()
+
+# Concurrent segment PUTs per segmented upload
+UPLOAD_WORKERS = 4
+
+# Parquet archives are written in row groups of this many rows and uploaded
+# in segments of roughly this many bytes; with at most UPLOAD_WORKERS segments
+# buffered or in flight, an upload holds about 64 MiB regardless of file size
+PARQUET_ROW_GROUP_SIZE = 256_000
+SEGMENT_SIZE = 16 * 1024 * 1024
 
 def get_swift_connection():
-    """Get a Swift connection with default test credentials"""
-    return swiftclient.Connection(
-        authurl="http://localhost:8080/auth/v1.0",
-        user="test:tester",
-        key="testing",
-        auth_version="1"
-    )
+    """Get this thread's Swift connection with default test credentials, reusing its session and auth token"""
+    conn = getattr(_conn_local, "conn", None)
+    if conn is None:
+        conn = swiftclient.Connection(
+            authurl="http://localhost:8080/auth/v1.0",
+            user="test:tester",
+            key="testing",
+            auth_version="1",
+            retries=3,
+            starting_backoff=1,
+            insecure=False
+        )
+        _conn_local.conn = conn
+    return conn
 
 def ensure_container_exists(conn, container_name="sensor-archive"):
-    """Ensure the container exists, create if it doesn't"""
+    """Ensure the container exists, create if it doesn't (checked once per process)"""
+    if container_name in _known_containers:
+        return
     try:
         conn.head_container(container_name)
         print(f"Container '{container_name}' already exists")
     except swiftclient.exceptions.ClientException:
         conn.put_container(container_name)
         print(f"Created container '{container_name}'")
+    _known_containers.add(container_name)
 
 def archive_sensor_data(data, filename=None):
     """Archive sensor data as JSON"""
@@ -34,12 +64,16 @@ def archive_sensor_data(data, filename=None):
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         filename = f"sensor_data_{timestamp}.json"
     
-    json_data = json.dumps(data, indent=2, default=str)
-    conn.put_object("sensor-archive", filename, contents=json_data.encode('utf-8'))
+    json_data = orjson.dumps(data, default=str, option=orjson.OPT_SERIALIZE_NUMPY)
+    conn.put_object("sensor-archive", filename, contents=json_data)
     print(f"Archived {len(data)} records to {filename}")
 
 def archive_csv_data(csv_content, filename=None):
-    """Archive CSV data"""
+    """Archive CSV data (a CSV string, DataFrame or list of record dicts)"""
+    if not isinstance(csv_content, str):
+        # pandas' native CSV writer, rather than a per-row csv.DictWriter
+        csv_content = pd.DataFrame(csv_content).to_csv(index=False)
+
     conn = get_swift_connection()
     ensure_container_exists(conn)
     
@@ -50,8 +84,132 @@ def archive_csv_data(csv_content, filename=None):
     conn.put_object("sensor-archive", filename, contents=csv_content.encode('utf-8'))
     print(f"Archived CSV data to {filename}")
 
+def put_buffer(conn, container, name, data, **kwargs):
+    """PUT an Arrow buffer as one object, streamed from a BufferReader (seekable, so retries rewind it)"""
+    return conn.put_object(container, name, contents=pa.BufferReader(data), content_length=data.size, **kwargs)
+
+def put_segment(segments_container, name, data, conn=None):
+    """PUT one large-object segment (an Arrow buffer), returning its Static Large Object manifest entry"""
+    etag = put_buffer(conn or get_swift_connection(), segments_container, name, data)
+    return {"path": f"/{segments_container}/{name}", "etag": etag, "size_bytes": data.size}
+
+def drain_uploads(pending, limit=0):
+    """Wait until at most `limit` uploads are still pending, re-raising the first upload error"""
+    while len(pending) > limit:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            future.result()
+    return pending
+
+class SegmentedUpload(io.RawIOBase):
+    """
+    Writable stream that uploads to Swift in fixed-size segments.
+
+    Output that fits in a single segment is stored as a plain object. Larger
+    output is stored as numbered segments in "<container>_segments" and
+    joined by a Static Large Object manifest under the requested name, which
+    lists every segment's etag and size (so it never depends on a container
+    listing that may not yet show the newest segments).
+    Segments live under a prefix unique to this upload, so a retry never
+    overwrites the segments behind an existing manifest.
+    Given an executor, segments are uploaded in the background (at most
+    UPLOAD_WORKERS in flight) while the caller keeps writing. `headers` are
+    sent with the final object (or manifest) PUT; if that PUT fails (e.g. 412
+    for If-None-Match: *), this upload's segments are deleted.
+    """
+
+    def __init__(self, conn, container, name, segment_size=SEGMENT_SIZE, executor=None, headers=None):
+        self.conn = conn
+        self.container = container
+        self.segments_container = f"{container}_segments"
+        self.name = name
+        self.segment_prefix = f"{name}/{uuid.uuid4().hex}/"
+        self.segment_size = segment_size
+        self.executor = executor
+        self.headers = headers
+        self.pending = set()
+        self.manifest = []
+        # Arrow-native buffer: ParquetWriter's pages land here and each segment
+        # is handed to swiftclient as a zero-copy pa.Buffer
+        self.buffer = pa.BufferOutputStream()
+        self.position = 0
+        self.segments = 0
+
+    def writable(self):
+        return True
+
+    def tell(self):
+        return self.position
+
+    def write(self, b):
+        written = self.buffer.write(b)
+        self.position += written
+        if self.buffer.tell() >= self.segment_size:
+            self._put_segment()
+        return written
+
+    def _put_segment(self):
+        if self.segments == 0:
+            ensure_container_exists(self.conn, self.segments_container)
+        self.segments += 1
+        segment_name = f"{self.segment_prefix}{self.segments:06d}"
+        data, self.buffer = self.buffer.getvalue(), pa.BufferOutputStream()
+        if self.executor is None:
+            self.manifest.append(put_segment(self.segments_container, segment_name, data, self.conn))
+        else:
+            future = self.executor.submit(put_segment, self.segments_container, segment_name, data)
+            self.manifest.append(future)
+            self.pending.add(future)
+            # Bound memory to UPLOAD_WORKERS segments (in flight plus the one being filled)
+            self.pending = drain_uploads(self.pending, UPLOAD_WORKERS - 1)
+
+    def finish(self):
+        """Upload any buffered bytes and, if segmented, the manifest object"""
+        if self.segments == 0:
+            put_buffer(self.conn, self.container, self.name, self.buffer.getvalue(), content_type="application/octet-stream", headers=self.headers)
+        else:
+            if self.buffer.tell():
+                self._put_segment()
+            self.pending = drain_uploads(self.pending)
+            segments = [entry.result() if isinstance(entry, Future) else entry for entry in self.manifest]
+            try:
+                put_manifest(self.conn, self.container, self.name, segments, headers=self.headers)
+            except Exception:
+                self.abort()
+                raise
+        self.buffer = pa.BufferOutputStream()
+
+    def abort(self):
+        """Discard buffered bytes and delete any segments this upload has written"""
+        self.buffer = pa.BufferOutputStream()
+        for future in self.pending:
+            future.cancel()
+        wait(self.pending)
+        self.pending = set()
+        for index in range(1, self.segments + 1):
+            try:
+                self.conn.delete_object(self.segments_container, f"{self.segment_prefix}{index:06d}")
+            except swiftclient.exceptions.ClientException:
+                pass
+        self.manifest = []
+        self.segments = 0
+
+def put_manifest(conn, container, name, segments, headers=None):
+    """Write a Static Large Object manifest joining `segments` ({path, etag, size_bytes} entries, in order)"""
+    conn.put_object(
+        container,
+        name,
+        contents=orjson.dumps(segments),
+        content_type="application/octet-stream",
+        query_string="multipart-manifest=put",
+        headers=headers
+    )
+
 def archive_parquet_data(df, filename=None):
-    """Archive Pandas DataFrame as Parquet"""
+    """Archive Pandas DataFrame (or list of record dicts) as ZSTD-compressed Parquet, streamed in segments"""
+    if not isinstance(df, pd.DataFrame):
+        df = pd.DataFrame(df)
+
     conn = get_swift_connection()
     ensure_container_exists(conn)
     
@@ -59,11 +217,19 @@ def archive_parquet_data(df, filename=None):
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         filename = f"sensor_data_{timestamp}.parquet"
     
-    buf = io.BytesIO()
-    df.to_parquet(buf, index=False, compression="snappy")
-    buf.seek(0)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    sink = SegmentedUpload(conn, "sensor-archive", filename)
+    try:
+        with pq.ParquetWriter(sink, table.schema, compression="zstd", use_dictionary=True) as writer:
+            for offset in range(0, table.num_rows, PARQUET_ROW_GROUP_SIZE):
+                writer.write_table(table.slice(offset, PARQUET_ROW_GROUP_SIZE))
+        sink.finish()
+    except Exception as e:
+        # Don't leave orphaned segments behind a half-written archive
+        print(f"Error archiving {filename}: {e}")
+        sink.abort()
+        raise
     
-    conn.put_object("sensor-archive", filename, contents=buf.read(), content_type="application/octet-stream")
     print(f"Archived {len(df)} records to {filename}")
 
 def list_archived_files():